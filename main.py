@@ -7,7 +7,18 @@ import requests
 from datetime import datetime
 import json
 import logging
-from typing import Optional, Dict, List
+import threading
+import time
+import atexit
+import locale
+import math
+import shutil
+import tempfile
+from collections import defaultdict
+from contextlib import contextmanager
+from functools import lru_cache
+from types import MappingProxyType
+from typing import Optional, Dict, List, Mapping, NamedTuple
 
 # --- Настройка логирования для отладки ---
 logging.basicConfig(
@@ -20,6 +31,21 @@ logging.basicConfig(
 )
 
 
+# Демо-курсы относительно USD на случай недоступности API
+DEMO_RATES = {
+    'USD': 1.0, 'EUR': 0.93, 'GBP': 0.79, 'JPY': 149.0,
+    'CAD': 1.36, 'AUD': 1.52, 'CHF': 0.88, 'CNY': 7.24,
+    'RUB': 92.5, 'INR': 83.2, 'BRL': 4.97, 'MXN': 17.1,
+}
+
+
+def demo_rate(from_curr: str, to_curr: str) -> float:
+    """Демо-курс обмена через USD (1.0 для неизвестных валют)"""
+    if from_curr not in DEMO_RATES or to_curr not in DEMO_RATES:
+        return 1.0
+    return DEMO_RATES[to_curr] / DEMO_RATES[from_curr]
+
+
 class ModernTheme:
     """Класс с современной цветовой схемой"""
     PRIMARY = "#6366f1"  # Фиолетовый
@@ -34,17 +60,164 @@ class ModernTheme:
     BORDER = "#e5e7eb"  # Цвет границ
 
 
-class CurrencyConverterPro:
-    """Профессиональный конвертер валют с расширенным функционалом"""
+# Количество знаков после запятой для валют, отличных от стандартных двух
+CURRENCY_DECIMALS = {
+    'JPY': 0, 'KRW': 0, 'VND': 0, 'CLP': 0, 'ISK': 0, 'UGX': 0, 'PYG': 0,
+    'BHD': 3, 'KWD': 3, 'OMR': 3, 'JOD': 3, 'TND': 3, 'LYD': 3, 'IQD': 3,
+}
 
-    def __init__(self):
+
+@lru_cache(maxsize=4096)
+def format_number(value: float, decimals: int) -> str:
+    """Форматирование числа с учетом локали и заданной точности
+
+    Результат кэшируется; при смене локали нужно вызвать
+    format_number.cache_clear().
+    """
+    return locale.format_string(f"%.{decimals}f", value, grouping=True)
+
+
+def format_money(value: float, currency: str) -> str:
+    """Форматирование денежной суммы с учетом точности валюты"""
+    return format_number(value, CURRENCY_DECIMALS.get(currency, 2))
+
+
+def format_rate(rate: float) -> str:
+    """Форматирование курса обмена
+
+    Не меньше 4 знаков после запятой; для курсов меньше единицы точность
+    увеличивается так, чтобы было видно 4 значащие цифры.
+    """
+    decimals = 4
+    if 0 < abs(rate) < 1:
+        decimals = min(12, 3 - math.floor(math.log10(abs(rate))))
+    return format_number(rate, decimals)
+
+
+class PerfProfiler:
+    """Учет времени, затраченного на форматирование и ввод-вывод
+
+    Категории: 'format' — форматирование и разбор строк, 'io' — чтение
+    и запись файла истории, 'http' — запросы к API курсов. Общий для
+    процесса экземпляр PROFILER включается переменной окружения
+    CURRENCY_PROFILE=1; при выключенном профилировщике measure() ничего
+    не замеряет.
+    """
+
+    def __init__(self, enabled: bool = False):
+        self.enabled = enabled
+        self.totals = defaultdict(float)
+        self.counts = defaultdict(int)
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def measure(self, category: str):
+        """Замер времени выполнения блока в категории ('format', 'io', 'http')"""
+        if not self.enabled:
+            yield
+            return
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            with self._lock:
+                self.totals[category] += elapsed
+                self.counts[category] += 1
+
+    def report(self) -> Dict[str, float]:
+        """Вывод накопленного времени по категориям в лог"""
+        with self._lock:
+            totals = dict(self.totals)
+            counts = dict(self.counts)
+        for category, total in sorted(totals.items()):
+            logging.info(f"Profile {category}: {total * 1000:.2f} ms in {counts[category]} calls")
+        return totals
+
+
+PROFILER = PerfProfiler(enabled=os.getenv("CURRENCY_PROFILE") == '1')
+if PROFILER.enabled:
+    atexit.register(PROFILER.report)
+
+
+# Блокировки записи по пути файла истории, общие для всех экземпляров
+_history_file_locks: Dict[str, threading.Lock] = {}
+_history_file_locks_guard = threading.Lock()
+
+
+def history_file_lock(path: str) -> threading.Lock:
+    """Общая для процесса блокировка записи файла истории"""
+    key = os.path.abspath(path)
+    with _history_file_locks_guard:
+        return _history_file_locks.setdefault(key, threading.Lock())
+
+
+class RateSnapshot(NamedTuple):
+    """Неизменяемый снимок списка валют и курсов относительно USD"""
+    currencies: tuple
+    rates: Mapping[str, float]
+    demo: bool = False
+
+
+class CurrencyConverterPro:
+    """Профессиональный конвертер валют с расширенным функционалом
+
+    Потокобезопасность: один экземпляр можно использовать из нескольких
+    потоков (пул потоков, сервер, asyncio через run_in_executor).
+
+    * Курсы хранятся в неизменяемом снимке RateSnapshot, который заменяется
+      целиком одним присваиванием. Чтение курсов (currencies,
+      exchange_rates, convert_to_all) идет без блокировок и всегда видит
+      согласованный снимок.
+    * Записи истории добавляются под блокировкой. Отложенные сохранения
+      выполняет фоновый поток, объединяя несколько записей в одну запись
+      на диск; flush_history(), close() и обработчик atexit пишут файл в
+      вызывающем потоке. Все записи в один файл (в том числе из разных
+      экземпляров) сериализуются блокировкой history_file_lock.
+    * Каждое сохранение перезаписывает файл истории целиком, поэтому
+      последний записавший экземпляр определяет содержимое файла.
+      Экземпляр, который больше не нужен, следует закрыть через close(),
+      иначе его история будет записана при выходе.
+    * conversion_history не следует изменять напрямую — используйте
+      add_history_entry(), clear_history() и load_history(). Записи,
+      добавленные во время load_history(), сохраняются после загруженных.
+    * Сетевые вызовы блокирующие; из asyncio их нужно вызывать через
+      run_in_executor, а не напрямую в цикле событий.
+    """
+
+    HISTORY_FILE = 'conversion_history.json'
+    HISTORY_FLUSH_INTERVAL = 0.5  # секунды ожидания для группировки записей
+
+    def __init__(self, history_file: Optional[str] = None):
         self.api_key = self.get_api_key()
         self.api_url = f"https://v6.exchangerate-api.com/v6/{self.api_key}/"
-        self.currencies = []
-        self.exchange_rates = {}
+        self.history_file = history_file or self.HISTORY_FILE
+        self._snapshot = RateSnapshot((), MappingProxyType({}))
+        self._demo_snapshot = RateSnapshot(
+            tuple(DEMO_RATES), MappingProxyType(dict(DEMO_RATES)), demo=True
+        )
         self.conversion_history = []
+        self._history_lock = threading.Lock()
+        self._flush_event = threading.Event()
+        self._closed = False
         self.setup_logging()
 
+        self.profiler = PROFILER
+
+        self._writer = threading.Thread(target=self._history_writer, daemon=True)
+        self._writer.start()
+        atexit.register(self.flush_history)
+
+    @property
+    def currencies(self) -> List[str]:
+        """Список доступных валют из текущего снимка"""
+        return list(self._snapshot.currencies)
+
+    @property
+    def exchange_rates(self) -> Mapping[str, float]:
+        """Курсы относительно USD из текущего снимка (только чтение)"""
+        return self._snapshot.rates
+
     def get_api_key(self) -> str:
         """Получение API ключа"""
         # 1. Попробовать получить из переменных окружения
@@ -76,28 +249,33 @@ class CurrencyConverterPro:
     def fetch_currencies(self) -> List[str]:
         """Получение списка доступных валют"""
         try:
-            response = requests.get(f"{self.api_url}/latest/USD", timeout=10)
+            with self.profiler.measure('http'):
+                response = requests.get(f"{self.api_url}/latest/USD", timeout=10)
             response.raise_for_status()
             data = response.json()
 
             if data["result"] == "success":
-                self.currencies = list(data["conversion_rates"].keys())
-                self.exchange_rates = data["conversion_rates"]
-                self.logger.info(f"Loaded {len(self.currencies)} currencies")
-                return self.currencies
+                rates = dict(data["conversion_rates"])
+                self._snapshot = RateSnapshot(tuple(rates), MappingProxyType(rates))
+                self.logger.info(f"Loaded {len(rates)} currencies")
+                return list(rates)
             else:
                 raise Exception(f"API error: {data.get('error-type', 'Unknown error')}")
 
         except requests.exceptions.RequestException as e:
             self.logger.error(f"Network error: {e}")
-            demo_currencies = ["USD", "EUR", "GBP", "JPY", "CAD", "AUD", "CHF", "CNY", "RUB", "INR", "BRL", "MXN"]
-            self.currencies = demo_currencies
-            return demo_currencies
+            return self._fallback_currencies()
         except Exception as e:
             self.logger.error(f"Unexpected error: {e}")
-            demo_currencies = ["USD", "EUR", "GBP", "JPY", "CAD", "AUD", "CHF", "CNY", "RUB", "INR", "BRL", "MXN"]
-            self.currencies = demo_currencies
-            return demo_currencies
+            return self._fallback_currencies()
+
+    def _fallback_currencies(self) -> List[str]:
+        """Сохранение прежнего снимка курсов или переход на демо-курсы"""
+        snapshot = self._snapshot
+        if not snapshot.rates:
+            snapshot = self._demo_snapshot
+            self._snapshot = snapshot
+        return list(snapshot.currencies)
 
     def convert_currency(self, from_curr: str, to_curr: str, amount: float) -> Optional[float]:
         """Конвертация валюты"""
@@ -108,10 +286,11 @@ class CurrencyConverterPro:
             if from_curr == to_curr:
                 return amount
 
-            response = requests.get(
-                f"{self.api_url}/pair/{from_curr}/{to_curr}/{amount}",
-                timeout=10
-            )
+            with self.profiler.measure('http'):
+                response = requests.get(
+                    f"{self.api_url}/pair/{from_curr}/{to_curr}/{amount}",
+                    timeout=10
+                )
             response.raise_for_status()
             data = response.json()
 
@@ -119,54 +298,28 @@ class CurrencyConverterPro:
                 result = data["conversion_result"]
 
                 # Сохраняем в историю
-                history_entry = {
-                    'timestamp': datetime.now().isoformat(),
-                    'from_currency': from_curr,
-                    'to_currency': to_curr,
-                    'amount': amount,
-                    'result': result,
-                    'rate': data.get('conversion_rate')
-                }
-                self.conversion_history.append(history_entry)
-                self.save_history()
+                history_entry = self.make_history_entry(
+                    from_curr, to_curr, amount, result, data.get('conversion_rate')
+                )
+                self.add_history_entry(history_entry)
 
                 self.logger.info(f"Converted {amount} {from_curr} to {result} {to_curr}")
                 return result
             else:
                 # Демо-конвертация при ошибке API
-                demo_rates = {
-                    ('USD', 'EUR'): 0.93, ('EUR', 'USD'): 1.07,
-                    ('USD', 'GBP'): 0.79, ('GBP', 'USD'): 1.27,
-                    ('USD', 'JPY'): 149.0, ('JPY', 'USD'): 0.0067,
-                    ('USD', 'RUB'): 92.5, ('RUB', 'USD'): 0.0108,
-                    ('EUR', 'RUB'): 99.0, ('RUB', 'EUR'): 0.0101,
-                }
-                rate = demo_rates.get((from_curr, to_curr), 1.0)
+                rate = demo_rate(from_curr, to_curr)
                 result = amount * rate
 
-                history_entry = {
-                    'timestamp': datetime.now().isoformat(),
-                    'from_currency': from_curr,
-                    'to_currency': to_curr,
-                    'amount': amount,
-                    'result': result,
-                    'rate': rate,
-                    'demo': True
-                }
-                self.conversion_history.append(history_entry)
-                self.save_history()
+                history_entry = self.make_history_entry(from_curr, to_curr, amount, result, rate)
+                history_entry['demo'] = True
+                self.add_history_entry(history_entry)
 
                 self.logger.info(f"Used demo conversion: {amount} {from_curr} to {result} {to_curr}")
                 return result
 
         except requests.exceptions.RequestException as e:
             self.logger.error(f"Network error during conversion: {e}")
-            demo_rates = {
-                ('USD', 'EUR'): 0.93, ('EUR', 'USD'): 1.07,
-                ('USD', 'GBP'): 0.79, ('GBP', 'USD'): 1.27,
-                ('USD', 'RUB'): 92.5, ('RUB', 'USD'): 0.0108,
-            }
-            rate = demo_rates.get((from_curr, to_curr), 1.0)
+            rate = demo_rate(from_curr, to_curr)
             result = amount * rate
             return result
         except Exception as e:
@@ -179,48 +332,185 @@ class CurrencyConverterPro:
             if from_curr == to_curr:
                 return 1.0
 
-            response = requests.get(f"{self.api_url}/pair/{from_curr}/{to_curr}/1", timeout=10)
+            with self.profiler.measure('http'):
+                response = requests.get(f"{self.api_url}/pair/{from_curr}/{to_curr}/1", timeout=10)
             response.raise_for_status()
             data = response.json()
 
             if data["result"] == "success":
                 return data["conversion_rate"]
             else:
-                demo_rates = {
-                    ('USD', 'EUR'): 0.93, ('EUR', 'USD'): 1.07,
-                    ('USD', 'GBP'): 0.79, ('GBP', 'USD'): 1.27,
-                    ('USD', 'JPY'): 149.0, ('JPY', 'USD'): 0.0067,
-                    ('USD', 'RUB'): 92.5, ('RUB', 'USD'): 0.0108,
-                }
-                return demo_rates.get((from_curr, to_curr), 1.0)
+                return demo_rate(from_curr, to_curr)
 
         except Exception as e:
             self.logger.error(f"Error getting exchange rate: {e}")
-            demo_rates = {
-                ('USD', 'EUR'): 0.93, ('EUR', 'USD'): 1.07,
-                ('USD', 'GBP'): 0.79, ('GBP', 'USD'): 1.27,
-                ('USD', 'RUB'): 92.5, ('RUB', 'USD'): 0.0108,
+            return demo_rate(from_curr, to_curr)
+
+    def convert_to_all(self, from_curr: str, amount: float,
+                       targets: Optional[List[str]] = None) -> Dict[str, float]:
+        """Конвертация суммы сразу во все (или выбранные) валюты.
+
+        Вся строка матрицы курсов считается за один проход по кэшу
+        курсов относительно USD, без HTTP-запросов и записи в историю.
+        Если курсы еще не загружены, используются демо-курсы (см.
+        uses_demo_rates()); для неизвестной валюты возвращается пустой
+        словарь.
+        """
+        if amount <= 0:
+            raise ValueError("Сумма должна быть положительной")
+
+        rates = self.exchange_rates
+        if from_curr not in rates:
+            rates = DEMO_RATES
+            if from_curr not in rates:
+                self.logger.error(f"No rates available for {from_curr}")
+                return {}
+
+        if targets is None:
+            targets = list(rates.keys())
+
+        factor = amount / rates[from_curr]
+        results = {curr: rates[curr] * factor for curr in targets if curr in rates}
+
+        self.logger.info(f"Converted {amount} {from_curr} to {len(results)} currencies")
+        return results
+
+    def uses_demo_rates(self, from_curr: str) -> bool:
+        """Будет ли convert_to_all() использовать демо-курсы для валюты"""
+        snapshot = self._snapshot
+        return snapshot.demo or from_curr not in snapshot.rates
+
+    def make_history_entry(self, from_curr: str, to_curr: str, amount: float,
+                           result: float, rate: Optional[float]) -> Dict:
+        """Создание записи истории с числовым временем и готовыми строками"""
+        timestamp = time.time()
+        with self.profiler.measure('format'):
+            return {
+                'timestamp': timestamp,
+                'from_currency': from_curr,
+                'to_currency': to_curr,
+                'amount': amount,
+                'result': result,
+                'rate': rate,
+                'time_display': time.strftime("%H:%M:%S", time.localtime(timestamp)),
+                'amount_display': format_money(amount, from_curr),
+                'result_display': format_money(result, to_curr),
             }
-            return demo_rates.get((from_curr, to_curr), 1.0)
+
+    def _normalize_history_entry(self, entry: Dict) -> Dict:
+        """Приведение записей старого формата (ISO-время, без готовых строк)"""
+        if isinstance(entry.get('timestamp'), str):
+            entry['timestamp'] = datetime.fromisoformat(entry['timestamp']).timestamp()
+        entry['timestamp'] = float(entry['timestamp'])
+        if 'time_display' not in entry:
+            entry['time_display'] = time.strftime("%H:%M:%S", time.localtime(entry['timestamp']))
+        if 'amount_display' not in entry:
+            entry['amount_display'] = format_money(entry['amount'], entry['from_currency'])
+        if 'result_display' not in entry:
+            entry['result_display'] = format_money(entry['result'], entry['to_currency'])
+        return entry
+
+    def _normalize_history(self, history: List[Dict]) -> List[Dict]:
+        """Нормализация записей истории с пропуском поврежденных"""
+        normalized = []
+        for index, entry in enumerate(history):
+            try:
+                normalized.append(self._normalize_history_entry(entry))
+            except Exception as e:
+                self.logger.error(f"Skipping invalid history record #{index}: {e}")
+        return normalized
+
+    def add_history_entry(self, entry: Dict):
+        """Добавление записи в историю с отложенным сохранением"""
+        with self._history_lock:
+            self.conversion_history.append(entry)
+        self.save_history()
+
+    def clear_history(self):
+        """Очистка истории конвертаций"""
+        with self._history_lock:
+            self.conversion_history = []
+        self.save_history()
 
     def save_history(self):
-        """Сохранение истории конвертаций"""
-        try:
-            with open('conversion_history.json', 'w', encoding='utf-8') as f:
-                json.dump(self.conversion_history, f, indent=2, ensure_ascii=False)
-        except Exception as e:
-            self.logger.error(f"Error saving history: {e}")
+        """Планирование сохранения истории фоновым потоком"""
+        self._flush_event.set()
+
+    def flush_history(self):
+        """Немедленное сохранение истории на диск (не действует после close)"""
+        if self._closed:
+            return
+        self._flush_event.clear()
+        self._write_history_file()
+
+    def close(self):
+        """Последнее сохранение истории и остановка фонового потока"""
+        if self._closed:
+            return
+        self._closed = True
+        atexit.unregister(self.flush_history)
+        self._flush_event.set()
+        self._writer.join()
+        self._write_history_file()
+
+    def _history_writer(self):
+        """Единственный поток, записывающий файл истории"""
+        while not self._closed:
+            self._flush_event.wait()
+            if self._closed:
+                break
+            # Ждем, чтобы объединить несколько записей в одну запись на диск
+            time.sleep(self.HISTORY_FLUSH_INTERVAL)
+            self._flush_event.clear()
+            self._write_history_file()
+
+    def _write_history_file(self):
+        """Атомарная запись файла истории"""
+        with history_file_lock(self.history_file):
+            with self._history_lock:
+                history = list(self.conversion_history)
+            tmp_path = None
+            try:
+                with self.profiler.measure('io'):
+                    with tempfile.NamedTemporaryFile(
+                        'w',
+                        encoding='utf-8',
+                        dir=os.path.dirname(os.path.abspath(self.history_file)),
+                        prefix=f"{os.path.basename(self.history_file)}.",
+                        suffix='.tmp',
+                        delete=False
+                    ) as f:
+                        tmp_path = f.name
+                        json.dump(history, f, indent=2, ensure_ascii=False)
+                    os.replace(tmp_path, self.history_file)
+            except Exception as e:
+                self.logger.error(f"Error saving history: {e}")
+                if tmp_path and os.path.exists(tmp_path):
+                    os.remove(tmp_path)
 
     def load_history(self):
         """Загрузка истории конвертаций"""
+        with self._history_lock:
+            current = self.conversion_history
+            seen = len(current)
         try:
-            with open('conversion_history.json', 'r', encoding='utf-8') as f:
-                self.conversion_history = json.load(f)
+            with self.profiler.measure('io'):
+                with open(self.history_file, 'r', encoding='utf-8') as f:
+                    history = json.load(f)
+            with self.profiler.measure('format'):
+                history = self._normalize_history(history)
         except FileNotFoundError:
-            self.conversion_history = []
+            history = []
         except Exception as e:
             self.logger.error(f"Error loading history: {e}")
-            self.conversion_history = []
+            history = []
+        with self._history_lock:
+            # Записи, добавленные другими потоками во время загрузки
+            if self.conversion_history is current:
+                appended = current[seen:]
+            else:
+                appended = list(self.conversion_history)
+            self.conversion_history = history + appended
 
 
 class ModernCurrencyConverterApp(tk.Tk):
@@ -232,6 +522,9 @@ class ModernCurrencyConverterApp(tk.Tk):
         # Инициализация бэкенда
         self.converter = CurrencyConverterPro()
         self.theme = ModernTheme()
+        self.fanout_window = None
+        self.fanout_sort = ('currency', False)
+        self.fanout_rows = []
 
         # Настройка главного окна
         self.title("💱 Конвертер Валют ")
@@ -476,6 +769,13 @@ class ModernCurrencyConverterApp(tk.Tk):
             text="📊 Обновить курсы",
             command=self.refresh_rates,
             style='Secondary.TButton'
+        ).pack(side=tk.LEFT, padx=(0, 10))
+
+        ttk.Button(
+            button_frame,
+            text="🌍 Во все валюты",
+            command=self.open_fanout_window,
+            style='Secondary.TButton'
         ).pack(side=tk.LEFT)
 
     def build_result_section(self, parent):
@@ -617,15 +917,23 @@ class ModernCurrencyConverterApp(tk.Tk):
             result = self.converter.convert_currency(from_curr, to_curr, amount)
 
             if result is not None:
-                self.result_var.set(f"{amount:.2f} {from_curr} = {result:.2f} {to_curr}")
+                with self.converter.profiler.measure('format'):
+                    result_text = (
+                        f"{format_money(amount, from_curr)} {from_curr} = "
+                        f"{format_money(result, to_curr)} {to_curr}"
+                    )
+                self.result_var.set(result_text)
 
                 # Получаем и отображаем курс
                 rate = self.converter.get_exchange_rate(from_curr, to_curr)
                 if rate:
-                    self.rate_var.set(f"💱 Курс обмена: 1 {from_curr} = {rate:.4f} {to_curr}")
+                    with self.converter.profiler.measure('format'):
+                        rate_text = f"💱 Курс обмена: 1 {from_curr} = {format_rate(rate)} {to_curr}"
+                    self.rate_var.set(rate_text)
 
                 # Обновляем историю
                 self.update_history_display()
+                self.update_fanout_display()
 
         except ValueError:
             messagebox.showerror("Ошибка", "Пожалуйста, введите корректное число для суммы")
@@ -643,8 +951,136 @@ class ModernCurrencyConverterApp(tk.Tk):
     def refresh_rates(self):
         """Обновление курсов валют"""
         self.converter.fetch_currencies()
+        if self.fanout_window is not None:
+            self.update_fanout_display()
         messagebox.showinfo("Успех", "Курсы валют обновлены!")
 
+    def open_fanout_window(self):
+        """Окно конвертации одной суммы во все валюты"""
+        if self.fanout_window is not None:
+            self.fanout_window.lift()
+            self.update_fanout_display()
+            return
+
+        window = tk.Toplevel(self)
+        window.title("🌍 Конвертация во все валюты")
+        window.geometry("420x600")
+        window.configure(bg=self.theme.LIGHT)
+        window.protocol("WM_DELETE_WINDOW", self.close_fanout_window)
+        self.fanout_window = window
+
+        container = ttk.Frame(window, style='Card.TFrame', padding=20)
+        container.pack(fill=tk.BOTH, expand=True)
+
+        filter_label = ttk.Label(
+            container,
+            text="Фильтр:",
+            font=('Segoe UI', 10, 'bold'),
+            foreground=self.theme.DARK,
+            background=self.theme.CARD_BG
+        )
+        filter_label.pack(anchor=tk.W, pady=(0, 8))
+
+        self.fanout_filter_var = tk.StringVar()
+        self.fanout_filter_var.trace_add('write', lambda *args: self.render_fanout())
+        ttk.Entry(
+            container,
+            textvariable=self.fanout_filter_var,
+            font=('Segoe UI', 10),
+            style='Modern.TEntry'
+        ).pack(fill=tk.X, pady=(0, 15))
+
+        table_frame = ttk.Frame(container, style='Card.TFrame')
+        table_frame.pack(fill=tk.BOTH, expand=True)
+
+        self.fanout_tree = ttk.Treeview(
+            table_frame,
+            columns=('currency', 'rate', 'result'),
+            show='headings',
+            style='Modern.Treeview'
+        )
+        self.fanout_tree.heading('currency', text=' Валюта',
+                                 command=lambda: self.sort_fanout('currency'))
+        self.fanout_tree.heading('rate', text=' Курс',
+                                 command=lambda: self.sort_fanout('rate'))
+        self.fanout_tree.heading('result', text=' Результат',
+                                 command=lambda: self.sort_fanout('result'))
+
+        self.fanout_tree.column('currency', width=80, anchor=tk.CENTER)
+        self.fanout_tree.column('rate', width=120, anchor=tk.CENTER)
+        self.fanout_tree.column('result', width=140, anchor=tk.CENTER)
+
+        scrollbar = ttk.Scrollbar(
+            table_frame,
+            orient=tk.VERTICAL,
+            command=self.fanout_tree.yview
+        )
+        self.fanout_tree.configure(yscrollcommand=scrollbar.set)
+
+        self.fanout_tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+
+        self.update_fanout_display()
+
+    def close_fanout_window(self):
+        """Закрытие окна конвертации во все валюты"""
+        self.fanout_window.destroy()
+        self.fanout_window = None
+
+    def sort_fanout(self, column: str):
+        """Сортировка таблицы по колонке (повторный клик меняет порядок)"""
+        if self.fanout_sort[0] == column:
+            self.fanout_sort = (column, not self.fanout_sort[1])
+        else:
+            self.fanout_sort = (column, False)
+        self.render_fanout()
+
+    def update_fanout_display(self):
+        """Пересчет таблицы конвертации во все валюты"""
+        if self.fanout_window is None:
+            return
+
+        from_curr = self.from_currency.get()
+        try:
+            amount = float(self.amount_var.get())
+            demo = self.converter.uses_demo_rates(from_curr)
+            results = self.converter.convert_to_all(from_curr, amount)
+        except ValueError:
+            results = {}
+            amount = 0
+
+        self.fanout_rows = [(curr, value / amount, value) for curr, value in results.items()]
+        with self.converter.profiler.measure('format'):
+            if results:
+                title = f"🌍 {format_money(amount, from_curr)} {from_curr} во все валюты"
+                if demo:
+                    title += " (демо-курсы, не актуальны)"
+            else:
+                title = f"🌍 Курсы для {from_curr or '—'} недоступны"
+        self.fanout_window.title(title)
+        self.render_fanout()
+
+    def render_fanout(self):
+        """Фильтрация и сортировка уже рассчитанной таблицы"""
+        if self.fanout_window is None:
+            return
+
+        for item in self.fanout_tree.get_children():
+            self.fanout_tree.delete(item)
+
+        query = self.fanout_filter_var.get().strip().upper()
+        rows = [row for row in self.fanout_rows if query in row[0]]
+
+        column, reverse = self.fanout_sort
+        key_index = {'currency': 0, 'rate': 1, 'result': 2}[column]
+        rows.sort(key=lambda row: row[key_index], reverse=reverse)
+
+        with self.converter.profiler.measure('format'):
+            values = [(curr, format_rate(rate), format_money(value, curr))
+                      for curr, rate, value in rows]
+        for row_values in values:
+            self.fanout_tree.insert('', tk.END, values=row_values)
+
     def update_history_display(self):
         """Обновление отображения истории"""
         # Очищаем текущие данные
@@ -655,20 +1091,18 @@ class ModernCurrencyConverterApp(tk.Tk):
         recent_history = self.converter.conversion_history[-10:]
 
         for entry in reversed(recent_history):
-            time_str = datetime.fromisoformat(entry['timestamp']).strftime("%H:%M:%S")
             self.history_tree.insert('', 0, values=(
-                time_str,
+                entry['time_display'],
                 entry['from_currency'],
                 entry['to_currency'],
-                f"{entry['amount']:.2f}",
-                f"{entry['result']:.2f}"
+                entry['amount_display'],
+                entry['result_display']
             ))
 
     def clear_history(self):
         """Очистка истории"""
         if messagebox.askyesno("Подтверждение", "Очистить всю историю конвертаций?"):
-            self.converter.conversion_history = []
-            self.converter.save_history()
+            self.converter.clear_history()
             self.update_history_display()
 
 
@@ -676,8 +1110,14 @@ def run_tests():
     """Тестирование функционала приложения"""
     print(" Запуск тестов")
 
+    # Тесты пишут историю во временный каталог, а не в историю пользователя
+    test_dir = tempfile.mkdtemp()
+    history_file = os.path.join(test_dir, 'conversion_history.json')
+    converters = []
+
     try:
-        converter = CurrencyConverterPro()
+        converter = CurrencyConverterPro(history_file)
+        converters.append(converter)
         print(" Тест инициализации API ключа пройден")
 
         currencies = converter.fetch_currencies()
@@ -692,6 +1132,44 @@ def run_tests():
         assert rate is not None, "Тест курса обмена не пройден"
         print(" Тест курса обмена пройден")
 
+        results = converter.convert_to_all('USD', 1.0, ['USD', 'EUR'])
+        assert results.get('USD') == 1.0, "Тест конвертации во все валюты не пройден"
+        for curr in DEMO_RATES:
+            assert converter.convert_to_all(curr, 1.0), "Тест конвертации во все валюты не пройден"
+        print(" Тест конвертации во все валюты пройден")
+
+        assert format_money(150.0, 'JPY') == '150', "Тест форматирования не пройден"
+        assert format_money(1.5, 'EUR') == locale.format_string("%.2f", 1.5), "Тест форматирования не пройден"
+        assert format_rate(0.00004) == locale.format_string("%.8f", 0.00004), "Тест форматирования не пройден"
+        print(" Тест форматирования сумм пройден")
+
+        # Закрытый экземпляр не должен перезаписать историю другого
+        converter.close()
+        second = CurrencyConverterPro(history_file)
+        converters.append(second)
+        second.load_history()
+        loaded = len(second.conversion_history)
+        second.add_history_entry(second.make_history_entry('USD', 'EUR', 2.0, 1.86, 0.93))
+        second.flush_history()
+        converter.flush_history()
+        check = CurrencyConverterPro(history_file)
+        converters.append(check)
+        check.load_history()
+        assert len(check.conversion_history) == loaded + 1, "Тест сохранения истории не пройден"
+        print(" Тест сохранения истории пройден")
+
+        legacy = [
+            {'timestamp': 'не дата', 'from_currency': 'USD'},
+            {'timestamp': 1.0, 'time_display': '00:00:01', 'from_currency': 'USD',
+             'to_currency': 'EUR', 'amount': 1.0, 'result': 0.93},
+            {'timestamp': '2024-01-01T10:00:00', 'from_currency': 'USD',
+             'to_currency': 'JPY', 'amount': 1.0, 'result': 149.0},
+        ]
+        normalized = check._normalize_history(legacy)
+        assert len(normalized) == 2, "Тест загрузки старой истории не пройден"
+        assert all('result_display' in entry for entry in normalized), "Тест загрузки старой истории не пройден"
+        print(" Тест загрузки старой истории пройден")
+
         print(" Все тесты пройдены!")
         return True
 
@@ -699,8 +1177,18 @@ def run_tests():
         print(f" Тесты не пройдены: {e}")
         return False
 
+    finally:
+        for instance in converters:
+            instance.close()
+        shutil.rmtree(test_dir, ignore_errors=True)
+
 
 if __name__ == "__main__":
+    try:
+        locale.setlocale(locale.LC_NUMERIC, '')
+    except locale.Error:
+        logging.warning("Не удалось установить системную локаль")
+
     # Запуск тестов при старте
     tests_passed = run_tests()
 